@@ -3,17 +3,22 @@ Script for crawling and downloading all HTML pages from mikecreighton.com,
 converting them to markdown, and creating a site map.
 """
 
+import asyncio
 import os
 import json
 import logging
+import multiprocessing
 import re
 import shutil
-from typing import Dict, List, Set, Optional, TypedDict
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Deque, Dict, List, Set, Optional, TypedDict
 from pathlib import Path
 from urllib.parse import urljoin, urlparse
 
-import requests
-from bs4 import BeautifulSoup
+import aiohttp
+import lxml.html
 from markitdown import MarkItDown
 
 
@@ -24,6 +29,21 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Maximum number of page downloads in flight at once
+MAX_CONCURRENT_REQUESTS = 16
+
+# User-Agent header sent with every request of the crawl
+USER_AGENT = "mikecreighton-dot-com-content-mcp/0.1.0"
+
+# Timeout in seconds for a single page download
+REQUEST_TIMEOUT = 30
+
+# Runs of whitespace, including carriage returns and newlines
+_WS_RE = re.compile(r"\s+")
+
+# MarkItDown converter owned by each conversion worker process
+_worker_converter: Optional[MarkItDown] = None
+
 
 class PageInfo(TypedDict):
     """Type definition for page information in the site map."""
@@ -35,21 +55,65 @@ class PageInfo(TypedDict):
     description: str  # Description of the page
 
 
+def _init_converter_worker() -> None:
+    """Create the MarkItDown converter once per conversion worker process."""
+    global _worker_converter
+    _worker_converter = MarkItDown()
+
+
+def convert_to_markdown(html_path: Path, markdown_path: Path) -> bool:
+    """
+    Convert HTML to Markdown using MarkItDown.
+
+    Runs inside a conversion worker process initialized by
+    `_init_converter_worker`.
+
+    Args:
+        html_path: Path to the HTML file.
+        markdown_path: Path to save the Markdown file.
+
+    Returns:
+        True if conversion successful, False otherwise.
+    """
+    try:
+        if _worker_converter is None:
+            raise RuntimeError("Converter worker not initialized")
+        result = _worker_converter.convert(str(html_path))
+
+        with open(markdown_path, "w", encoding="utf-8") as f:
+            f.write(result.text_content)
+
+        return True
+    except Exception as e:
+        logger.error(f"Failed to convert {html_path} to markdown: {e}")
+        return False
+
+
 class WebsiteCrawler:
     """Crawler for downloading mikecreighton.com website content."""
 
-    def __init__(self, base_url: str = "https://mikecreighton.com"):
+    def __init__(
+        self,
+        base_url: str = "https://mikecreighton.com",
+        max_concurrency: int = MAX_CONCURRENT_REQUESTS,
+    ):
         """
         Initialize the crawler.
 
         Args:
             base_url: The base URL of the website to crawl.
+            max_concurrency: Maximum number of pages downloaded concurrently.
         """
         self.base_url = base_url
         self.visited: Set[str] = set()
-        self.to_visit: List[str] = ["/"]
+        self.to_visit: Deque[str] = deque(["/"])
+        self.queued: Set[str] = {"/"}  # Every path ever added to to_visit
         self.site_map: Dict[str, PageInfo] = {}
 
+        # Limit the number of in-flight requests to stay polite to the server
+        self.max_concurrency = max_concurrency
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+
         # Set up directories
         self.html_dir = Path("./html")
         self.markdown_dir = Path("./markdown")
@@ -58,9 +122,6 @@ class WebsiteCrawler:
         self._clear_directory(self.html_dir)
         self._clear_directory(self.markdown_dir)
 
-        # Initialize MarkItDown
-        self.md_converter = MarkItDown()
-
     def _clear_directory(self, directory: Path) -> None:
         """
         Clear all files and subdirectories in the given directory path.
@@ -93,8 +154,12 @@ class WebsiteCrawler:
         Returns:
             Normalized path string.
         """
-        parsed = urlparse(url)
-        path = parsed.path.rstrip("/")
+        # Site-local paths are the common case, so skip urlparse for them;
+        # "//" starts a network location and ";" starts path parameters
+        if url.startswith("/") and not url.startswith("//") and ";" not in url:
+            path = url.partition("#")[0].partition("?")[0].rstrip("/")
+        else:
+            path = urlparse(url).path.rstrip("/")
 
         # Handle root path
         if not path:
@@ -129,20 +194,26 @@ class WebsiteCrawler:
 
         return html_path, markdown_path, normalized
 
-    def extract_page_info(self, soup: BeautifulSoup) -> tuple[str, str]:
+    def extract_page_info(self, tree: lxml.html.HtmlElement) -> tuple[str, str]:
         """
         Extract title and description from HTML.
 
         Args:
-            soup: BeautifulSoup object of the page.
+            tree: Parsed lxml document of the page.
 
         Returns:
             Tuple of (title, description).
         """
-        title = soup.title.string if soup.title else "No Title"
+        # Search the whole document: libxml2 closes <head> early on stray body
+        # content (e.g. a tracking <img>), pushing later head elements into <body>
+        title = tree.findtext(".//title")
+        if title is None:
+            title = "No Title"
 
-        description_meta = soup.find("meta", attrs={"name": "description"})
-        description = description_meta.get("content", "") if description_meta else ""
+        description_meta = tree.find('.//meta[@name="description"]')
+        description = (
+            description_meta.get("content", "") if description_meta is not None else ""
+        )
 
         # Clean up title and description - remove leading/trailing whitespace,
         # carriage returns, and consecutive spaces
@@ -165,23 +236,21 @@ class WebsiteCrawler:
         if not text:
             return ""
 
-        # Remove carriage returns and newlines
-        text = text.replace("\r", " ").replace("\n", " ")
-
-        # Replace consecutive spaces with a single space using regex
-        text = re.sub(r"\s+", " ", text)
+        # Replace carriage returns, newlines and consecutive spaces with a
+        # single space
+        text = _WS_RE.sub(" ", text)
 
         # Remove leading and trailing whitespace
         text = text.strip()
 
         return text
 
-    def extract_links(self, soup: BeautifulSoup, current_url: str) -> List[str]:
+    def extract_links(self, tree: lxml.html.HtmlElement, current_url: str) -> List[str]:
         """
         Extract links from the page that belong to the same domain.
 
         Args:
-            soup: BeautifulSoup object of the page.
+            tree: Parsed lxml document of the page.
             current_url: The current URL being processed.
 
         Returns:
@@ -189,8 +258,10 @@ class WebsiteCrawler:
         """
         links = []
 
-        for a_tag in soup.find_all("a", href=True):
-            href = a_tag["href"]
+        for element, attribute, href, _ in tree.iterlinks():
+            if element.tag != "a" or attribute != "href":
+                continue
+
             absolute_url = urljoin(self.base_url, href)
 
             # Only include links to the same domain
@@ -200,105 +271,182 @@ class WebsiteCrawler:
                 if (
                     relative_path
                     and relative_path not in self.visited
-                    and relative_path not in self.to_visit
+                    and relative_path not in self.queued
                 ):
                     links.append(relative_path)
+                    self.queued.add(relative_path)
 
         return links
 
-    def download_page(self, url_path: str) -> Optional[BeautifulSoup]:
+    async def download_page(
+        self, session: aiohttp.ClientSession, url_path: str
+    ) -> Optional[lxml.html.HtmlElement]:
         """
         Download a page and save it as HTML.
 
         Args:
+            session: The HTTP session shared by all downloads of the crawl.
             url_path: The URL path to download.
 
         Returns:
-            BeautifulSoup object of the downloaded page or None if failed.
+            Parsed lxml document of the downloaded page or None if failed.
         """
         full_url = urljoin(self.base_url, url_path)
-        logger.info(f"Downloading: {full_url}")
+        part_path: Optional[Path] = None
 
         try:
-            response = requests.get(full_url, timeout=30)
-            response.raise_for_status()
-
-            html_content = response.text
             html_path, _, _ = self.get_file_paths(url_path)
 
-            # Save HTML content
-            with open(html_path, "w", encoding="utf-8") as f:
-                f.write(html_content)
-
-            return BeautifulSoup(html_content, "html.parser")
+            async with self.semaphore:
+                logger.info(f"Downloading: {full_url}")
+                async with session.get(full_url) as response:
+                    response.raise_for_status()
+                    charset = response.charset
+                    html_bytes = await response.read()
+
+            # Decode once, with the Content-Type charset or else UTF-8, and use
+            # the text both for parsing and for saving the page
+            html_text: Optional[str] = None
+            for encoding in (charset, "utf-8"):
+                if encoding is None:
+                    continue
+                try:
+                    html_text = html_bytes.decode(encoding)
+                    break
+                except (LookupError, UnicodeDecodeError):
+                    # Unknown charset name or bytes that don't match it
+                    pass
+
+            if html_text is None:
+                # Let lxml detect the encoding from the bytes (e.g. <meta charset>)
+                tree = lxml.html.document_fromstring(html_bytes)
+                html_text = html_bytes.decode(
+                    tree.getroottree().docinfo.encoding or "utf-8", errors="replace"
+                )
+            else:
+                try:
+                    tree = lxml.html.document_fromstring(html_text)
+                except ValueError:
+                    # lxml refuses text with an XML encoding declaration, so
+                    # parse the bytes with the encoding that worked instead
+                    parser = lxml.html.HTMLParser(encoding=encoding)
+                    tree = lxml.html.document_fromstring(html_bytes, parser=parser)
+
+            # Save the page as UTF-8, which is how MarkItDown reads HTML files.
+            # Write to a temporary name first so a failure never leaves a
+            # truncated file behind
+            part_path = html_path.with_name(f"{html_path.name}.part")
+            with open(part_path, "w", encoding="utf-8") as f:
+                f.write(html_text)
+            os.replace(part_path, html_path)
+
+            return tree
         except Exception as e:
             logger.error(f"Failed to download {full_url}: {e}")
+            if part_path is not None:
+                part_path.unlink(missing_ok=True)
             return None
 
-    def convert_to_markdown(self, html_path: Path, markdown_path: Path) -> bool:
-        """
-        Convert HTML to Markdown using MarkItDown.
-
-        Args:
-            html_path: Path to the HTML file.
-            markdown_path: Path to save the Markdown file.
-
-        Returns:
-            True if conversion successful, False otherwise.
-        """
-        try:
-            result = self.md_converter.convert(str(html_path))
-
-            with open(markdown_path, "w", encoding="utf-8") as f:
-                f.write(result.text_content)
-
-            return True
-        except Exception as e:
-            logger.error(f"Failed to convert {html_path} to markdown: {e}")
-            return False
-
-    def crawl(self) -> Dict[str, PageInfo]:
+    async def crawl(self) -> Dict[str, PageInfo]:
         """
         Crawl the website, download pages, convert to markdown, and create site map.
 
+        Pages are crawled breadth-first: every page of the current level is
+        downloaded concurrently, then the links found on them form the next level.
+        Markdown conversion is CPU-bound, so it runs in a process pool while the
+        crawl keeps downloading.
+
         Returns:
             Dictionary containing the site map.
         """
-        while self.to_visit:
-            current_path = self.to_visit.pop(0)
-
-            if current_path in self.visited:
-                continue
-
-            self.visited.add(current_path)
-
-            soup = self.download_page(current_path)
-            if not soup:
-                continue
-
-            # Get file paths
-            html_path, markdown_path, base_path = self.get_file_paths(current_path)
-
-            # Extract page info
-            title, description = self.extract_page_info(soup)
-
-            # Convert to markdown
-            markdown_success = self.convert_to_markdown(html_path, markdown_path)
-
-            # Add to site map
-            self.site_map[base_path] = {
-                "base": base_path,
-                "html": f"./html/{base_path}.html",
-                "markdown": f"./markdown/{base_path}.md" if markdown_success else "",
-                "name": title,
-                "description": description,
-            }
-
-            # Extract links and add to queue
-            new_links = self.extract_links(soup, current_path)
-            self.to_visit.extend(new_links)
-
-            logger.info(f"Processed: {current_path} ({len(self.to_visit)} remaining)")
+        loop = asyncio.get_running_loop()
+        conversions: List[tuple[str, asyncio.Future[bool]]] = []
+
+        # Workers start lazily, once aiohttp's resolver threads are running, so
+        # use forkserver rather than forking this multi-threaded process
+        with ProcessPoolExecutor(
+            max_workers=os.cpu_count(),
+            mp_context=multiprocessing.get_context("forkserver"),
+            initializer=_init_converter_worker,
+        ) as executor:
+            # One session for the whole crawl so keep-alive connections (and
+            # their TLS handshakes) are reused, pooled up to the request limit
+            async with aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.max_concurrency),
+                headers={"User-Agent": USER_AGENT},
+                timeout=aiohttp.ClientTimeout(total=REQUEST_TIMEOUT),
+            ) as session:
+                while self.to_visit:
+                    # Drain the queue into the current level; paths are only
+                    # touched from this task
+                    level: List[str] = []
+                    while self.to_visit:
+                        path = self.to_visit.popleft()
+                        if path not in self.visited:
+                            self.visited.add(path)
+                            level.append(path)
+
+                    trees = await asyncio.gather(
+                        *(self.download_page(session, path) for path in level)
+                    )
+
+                    for current_path, tree in zip(level, trees):
+                        if tree is None:
+                            continue
+
+                        # Get file paths
+                        html_path, markdown_path, base_path = self.get_file_paths(
+                            current_path
+                        )
+
+                        # Extract page info
+                        title, description = self.extract_page_info(tree)
+
+                        # Queue the markdown conversion
+                        try:
+                            conversion = loop.run_in_executor(
+                                executor,
+                                convert_to_markdown,
+                                html_path,
+                                markdown_path,
+                            )
+                        except BrokenProcessPool as e:
+                            # Keep crawling; the page just won't get markdown
+                            conversion = loop.create_future()
+                            conversion.set_exception(e)
+                        conversions.append((base_path, conversion))
+
+                        # Add to site map
+                        self.site_map[base_path] = {
+                            "base": base_path,
+                            "html": f"./html/{base_path}.html",
+                            "markdown": f"./markdown/{base_path}.md",
+                            "name": title,
+                            "description": description,
+                        }
+
+                        # Extract links and add to queue
+                        new_links = self.extract_links(tree, current_path)
+                        self.to_visit.extend(new_links)
+
+                        logger.info(
+                            f"Processed: {current_path} ({len(self.to_visit)} queued)"
+                        )
+
+            # Drop the markdown path of any page that failed to convert. A
+            # worker that died (e.g. BrokenProcessPool) only fails its own pages
+            # rather than aborting the crawl
+            results = await asyncio.gather(
+                *(future for _, future in conversions), return_exceptions=True
+            )
+            for (base_path, _), markdown_success in zip(conversions, results):
+                if isinstance(markdown_success, BaseException):
+                    logger.error(
+                        f"Failed to convert {base_path} to markdown: {markdown_success}"
+                    )
+                    markdown_success = False
+                if not markdown_success:
+                    self.site_map[base_path]["markdown"] = ""
 
         return self.site_map
 
@@ -320,7 +468,7 @@ def main() -> None:
     logger.info("Starting mikecreighton.com website crawler")
 
     crawler = WebsiteCrawler()
-    site_map = crawler.crawl()
+    site_map = asyncio.run(crawler.crawl())
     crawler.save_site_map()
 
     logger.info(f"Crawling complete. Downloaded {len(site_map)} pages.")
@@ -2,9 +2,12 @@
 Model Context Protocol (MCP) server for MikeCreighton.com content.
 """
 
+import functools
 import json
 import os
-from typing import Dict, List, Any, Optional
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Any, Optional, Tuple
 from pydantic import AnyUrl
 
 from mcp.server.fastmcp import FastMCP
@@ -16,20 +19,109 @@ from mcp.server.fastmcp.resources.types import FileResource
 # Create an MCP server
 mcp = FastMCP("MikeCreighton.com Content")
 
+# Search index entry: (page_id, title_lower, description_lower, title, description)
+SearchEntry = Tuple[str, str, str, str, str]
 
-def load_site_map() -> Dict[str, Any]:
+
+@dataclass(slots=True)
+class PageRecord:
+    """A page of the site map, as loaded by the server."""
+
+    base: str  # Base path of the page which acts as the unique identifier
+    html: str  # Path to the HTML file
+    markdown: str  # Path to the Markdown file, empty if conversion failed
+    name: str  # Title of the page
+    description: str  # Description of the page
+    abs_markdown: str  # Absolute path to the Markdown file
+
+
+@functools.lru_cache(maxsize=1)
+def _read_site_map(mtime_ns: int) -> Tuple[Dict[str, PageRecord], List[SearchEntry]]:
     """
-    Load the site map from the JSON file.
+    Read and parse the site map JSON file and build its search index.
+
+    The result is cached per modification time of the file, so the file is only
+    parsed again after it changes (e.g. when download.py is re-run).
+
+    Args:
+        mtime_ns: Modification time of site_map.json in nanoseconds.
 
     Returns:
-        Dict containing the site map.
+        Tuple of (site map, search index).
     """
     try:
         with open("site_map.json", "r", encoding="utf-8") as f:
-            return json.load(f)
+            raw_site_map: Dict[str, Any] = json.load(f)
     except (FileNotFoundError, json.JSONDecodeError) as e:
         print(f"Error loading site_map.json: {e}")
-        return {}
+        return {}, []
+
+    # Markdown paths are relative to the working directory; resolve it only once
+    cwd = Path.cwd()
+
+    site_map = {}
+    search_index = []
+    for page_id, page_info in raw_site_map.items():
+        markdown = page_info.get("markdown", "")
+        page = PageRecord(
+            base=page_info.get("base", page_id),
+            html=page_info.get("html", ""),
+            markdown=markdown,
+            name=page_info.get("name", ""),
+            description=page_info.get("description", ""),
+            # Resolve the markdown path once here rather than on every tool call
+            abs_markdown=str(cwd / markdown.removeprefix("./")),
+        )
+        site_map[page_id] = page
+        search_index.append(
+            (
+                page_id,
+                page.name.lower(),
+                page.description.lower(),
+                page.name,
+                page.description,
+            )
+        )
+
+    return site_map, search_index
+
+
+def _load_cached_site_map() -> Tuple[Dict[str, PageRecord], List[SearchEntry]]:
+    """
+    Get the cached site map and search index, re-reading them if the file changed.
+
+    Returns:
+        Tuple of (site map, search index).
+    """
+    try:
+        mtime_ns = os.stat("site_map.json").st_mtime_ns
+    except FileNotFoundError as e:
+        print(f"Error loading site_map.json: {e}")
+        return {}, []
+
+    return _read_site_map(mtime_ns)
+
+
+def load_site_map() -> Dict[str, PageRecord]:
+    """
+    Load the site map from the JSON file.
+
+    The parsed site map is shared between calls and must not be modified.
+
+    Returns:
+        Dict mapping each page_id to its page record.
+    """
+    return _load_cached_site_map()[0]
+
+
+def load_search_index() -> List[SearchEntry]:
+    """
+    Load the search index built from the site map's page titles and descriptions.
+
+    Returns:
+        List of search index entries, one per page.
+    """
+    return _load_cached_site_map()[1]
 
 
 def read_file(file_path: str) -> Optional[str]:
@@ -42,10 +134,6 @@ def read_file(file_path: str) -> Optional[str]:
     Returns:
         The file contents as a string, or None if the file couldn't be read.
     """
-    # Remove the leading ./ if present
-    if file_path.startswith("./"):
-        file_path = file_path[2:]
-
     try:
         with open(file_path, "r", encoding="utf-8") as f:
             return f.read()
@@ -68,16 +156,15 @@ async def get_page_content(page_id: str) -> str:
     Returns:
         The Markdown content for the page.
     """
-    site_map = load_site_map()
+    page = load_site_map().get(page_id)
 
-    if page_id not in site_map:
+    if page is None:
         raise ValueError(f"Page '{page_id}' not found")
 
-    markdown_path = site_map[page_id].get("markdown", "")
-    if not markdown_path:
+    if not page.markdown:
         raise ValueError(f"No Markdown content available for '{page_id}'")
 
-    content = read_file(markdown_path)
+    content = read_file(page.abs_markdown)
     if content is None:
         raise ValueError(f"Could not read Markdown content for '{page_id}'")
 
@@ -96,12 +183,12 @@ async def list_pages() -> List[Dict[str, str]]:
     site_map = load_site_map()
     pages = []
 
-    for page_id, page_info in site_map.items():
+    for page_id, page in site_map.items():
         pages.append(
             {
                 "page_id": page_id,
-                "title": page_info.get("name", ""),
-                "description": page_info.get("description", ""),
+                "title": page.name,
+                "description": page.description,
             }
         )
 
@@ -123,62 +210,61 @@ async def search_pages(query: str) -> List[Dict[str, str]]:
             - description (str): Brief description of the page
             - relevance (str): Either "high" (query in title) or "medium" (query in description)
     """
-    site_map = load_site_map()
-    results = []
+    high: List[Dict[str, str]] = []
+    medium: List[Dict[str, str]] = []
 
     query = query.lower()
-    for page_id, page_info in site_map.items():
-        title = page_info.get("name", "").lower()
-        description = page_info.get("description", "").lower()
-
-        if query in title or query in description:
-            results.append(
-                {
-                    "page_id": page_id,
-                    "title": page_info.get("name", ""),
-                    "description": page_info.get("description", ""),
-                    "relevance": "high" if query in title else "medium",
-                }
-            )
-
-    # Sort by relevance
-    results.sort(key=lambda x: 0 if x["relevance"] == "high" else 1)
+    search_index = load_search_index()
+    for page_id, title_lower, description_lower, title, description in search_index:
+        if query in title_lower:
+            relevance, results = "high", high
+        elif query in description_lower:
+            relevance, results = "medium", medium
+        else:
+            continue
+
+        results.append(
+            {
+                "page_id": page_id,
+                "title": title,
+                "description": description,
+                "relevance": relevance,
+            }
+        )
 
-    return results
+    # Title matches come first
+    return high + medium
 
 
 if __name__ == "__main__":
-    # Check if site_map.json exists, if not suggest running download.py
-    if not os.path.exists("site_map.json"):
+    # Load the site map up front; the tools reuse this cached copy. If it's
+    # missing or empty, suggest running download.py
+    site_map_items = load_site_map()
+    if not site_map_items:
         print(
-            "Warning: site_map.json not found. Please run download.py first to crawl the website."
+            "Warning: site_map.json not found or empty. Please run download.py first to crawl the website."
         )
     else:
-
-        # Add all the pages to the MCP server as resources
-        site_map_items = load_site_map()
-        for page_id, page_info in site_map_items.items():
-            # Get the markdown file path but strip off the leading ./
-            markdown_path = page_info["markdown"]
-            if markdown_path.startswith("./"):
-                markdown_path = markdown_path[2:]
-            full_cwd_path = os.path.join(os.getcwd(), markdown_path)
-
-            # We're going straight to the FileResource type here because it's a
-            # simple way to get the content of the file into the MCP server without
-            # having to handle the file reading logic. We need to do this because
-            # we don't want to use the @mcp.resource decorator since we can't
-            # dynamically create those functions at runtime.
-            mcp.add_resource(
-                FileResource(
-                    uri=f"mikecreighton://page/{page_id}",
-                    name=page_info["name"],
-                    description=page_info["description"],
-                    mime_type="text/markdown",
-                    path=full_cwd_path,
-                    is_binary=False,
-                )
+        # Add all the pages to the MCP server as resources.
+        #
+        # We're going straight to the FileResource type here because it's a
+        # simple way to get the content of the file into the MCP server without
+        # having to handle the file reading logic. We need to do this because
+        # we don't want to use the @mcp.resource decorator since we can't
+        # dynamically create those functions at runtime.
+        resources = [
+            FileResource(
+                uri=f"mikecreighton://page/{page_id}",
+                name=page.name,
+                description=page.description,
+                mime_type="text/markdown",
+                path=page.abs_markdown,
+                is_binary=False,
             )
+            for page_id, page in site_map_items.items()
+        ]
+        for resource in resources:
+            mcp.add_resource(resource)
 
         print("Starting MCP server...")
         mcp.run(transport="stdio")